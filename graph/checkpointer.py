@@ -0,0 +1,128 @@
+"""
+Omvyx Voice — Bounded in-process checkpointer
+
+MemorySaver keeps every checkpoint of every thread (one thread per Retell
+call) for the life of the process.  A voice server runs for days, so that
+is an unbounded leak.  BoundedMemorySaver is a drop-in MemorySaver that:
+
+    - keeps only the newest `max_checkpoints_per_thread` checkpoints of a
+      thread (plus their pending writes and the channel blobs they use);
+    - keeps at most `max_threads` threads, evicting the least recently
+      written call first.
+
+Resuming a call only ever needs the latest checkpoint, so a finished or
+evicted call loses nothing the graph reads.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata
+from langgraph.checkpoint.memory import MemorySaver
+
+
+class BoundedMemorySaver(MemorySaver):
+    """MemorySaver with LRU thread eviction and per-thread checkpoint pruning."""
+
+    def __init__(
+        self,
+        *,
+        max_threads: int = 1000,
+        max_checkpoints_per_thread: int = 4,
+        serde: Any = None,
+    ) -> None:
+        super().__init__(serde=serde)
+        self.max_threads = max_threads
+        self.max_checkpoints_per_thread = max_checkpoints_per_thread
+        # thread_id -> None, least recently written first
+        self._lru: OrderedDict[str, None] = OrderedDict()
+        # Per-thread indexes so pruning / eviction never scans the global
+        # writes and blobs dicts.
+        self._versions: dict[str, dict[tuple[str, str], dict[str, Any]]] = {}
+        self._blob_keys: dict[str, set[tuple]] = {}
+        self._write_keys: dict[str, set[tuple]] = {}
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+
+        self._versions.setdefault(thread_id, {})[
+            (checkpoint_ns, checkpoint["id"])
+        ] = dict(checkpoint["channel_versions"])
+        self._blob_keys.setdefault(thread_id, set()).update(
+            (thread_id, checkpoint_ns, k, v) for k, v in new_versions.items()
+        )
+        self._prune(thread_id, checkpoint_ns)
+
+        self._lru[thread_id] = None
+        self._lru.move_to_end(thread_id)
+        while len(self._lru) > self.max_threads:
+            oldest = next(iter(self._lru))
+            self.delete_thread(oldest)
+        return next_config
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        super().put_writes(config, writes, task_id, task_path)
+        thread_id = config["configurable"]["thread_id"]
+        self._write_keys.setdefault(thread_id, set()).add((
+            thread_id,
+            config["configurable"]["checkpoint_ns"],
+            config["configurable"]["checkpoint_id"],
+        ))
+
+    def delete_thread(self, thread_id: str) -> None:
+        self._lru.pop(thread_id, None)
+        self.storage.pop(thread_id, None)
+        # get_tuple() reads writes through a defaultdict, which leaves an
+        # empty entry behind for every checkpoint it loaded.
+        for ns, checkpoint_id in self._versions.pop(thread_id, ()):
+            self.writes.pop((thread_id, ns, checkpoint_id), None)
+        for key in self._blob_keys.pop(thread_id, ()):
+            self.blobs.pop(key, None)
+        for key in self._write_keys.pop(thread_id, ()):
+            self.writes.pop(key, None)
+
+    def _prune(self, thread_id: str, checkpoint_ns: str) -> None:
+        """Drop all but the newest checkpoints of one thread namespace."""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        excess = len(checkpoints) - self.max_checkpoints_per_thread
+        if excess <= 0:
+            return
+
+        versions = self._versions[thread_id]
+        write_keys = self._write_keys.get(thread_id, set())
+        # Checkpoint ids are time-ordered (uuid6), so sorted order is age.
+        for checkpoint_id in sorted(checkpoints)[:excess]:
+            del checkpoints[checkpoint_id]
+            versions.pop((checkpoint_ns, checkpoint_id), None)
+            key = (thread_id, checkpoint_ns, checkpoint_id)
+            self.writes.pop(key, None)
+            write_keys.discard(key)
+
+        # A blob survives only while a remaining checkpoint references it.
+        live = {
+            (thread_id, ns, channel, version)
+            for (ns, _), channel_versions in versions.items()
+            for channel, version in channel_versions.items()
+        }
+        blob_keys = self._blob_keys[thread_id]
+        for key in [k for k in blob_keys if k[1] == checkpoint_ns and k not in live]:
+            self.blobs.pop(key, None)
+            blob_keys.discard(key)
@@ -11,9 +11,10 @@ keyed by Retell's call_id (used as the LangGraph thread_id).
 
 from __future__ import annotations
 
+from dataclasses import dataclass, field
 from typing import Any, Literal
 
-from pydantic import BaseModel, Field
+from pydantic import Field
 from langgraph.graph import MessagesState
 
 
@@ -27,9 +28,17 @@ REQUIRED_FIELDS: list[str] = ["dni", "name", "intent"]
 
 # ---------------------------------------------------------------------------
 # Sub-models
+#
+# Plain slotted dataclasses, not Pydantic: they only ever hold data our own
+# nodes produced (external CRM data is merged in field by field), so there
+# is nothing to validate, and nodes rebuild them on every turn.  Frozen:
+# nodes derive a new instance with dataclasses.replace() (building a fresh
+# profile_data dict when it changes), so one instance can be shared across
+# nodes and checkpoints without copying.
 # ---------------------------------------------------------------------------
 
-class ClientProfile(BaseModel):
+@dataclass(slots=True, frozen=True)
+class ClientProfile:
     """
     Unified client entity object.  Replaces the old loose UserProfile +
     user_found + missing_fields trio with a single coherent structure.
@@ -45,11 +54,12 @@ class ClientProfile(BaseModel):
     identity_key: str | None = None
     is_verified: bool = False
     is_new_customer: bool = True
-    profile_data: dict[str, Any] = Field(default_factory=dict)
-    interaction_history: list[dict[str, Any]] = Field(default_factory=list)
+    profile_data: dict[str, Any] = field(default_factory=dict)
+    interaction_history: list[dict[str, Any]] = field(default_factory=list)
 
 
-class BookingRequest(BaseModel):
+@dataclass(slots=True, frozen=True)
+class BookingRequest:
     """Temporary holder for an in-progress appointment booking."""
     requested_date: str | None = None
     confirmed_slot: str | None = None
@@ -71,8 +81,9 @@ class OmvyxState(MessagesState):
     - missing_required_fields: dynamically computed list of fields still
       needed before the call can proceed.  The deterministic checklist
       router skips any field already present in client_profile.profile_data.
-    - system_initialized: ensures the system prompt is injected exactly
-      once inside the graph (not prepended on every webhook call).
+    - system_initialized: set on the call's first turn.  The system prompt
+      itself is never stored in messages (it would be re-serialized into
+      every checkpoint) — see get_system_prompt() in graph.workflow.
     """
 
     # Call metadata
@@ -88,13 +99,28 @@ class OmvyxState(MessagesState):
     current_slot: str = ""
     interrupted_by_faq: bool = False
 
+    # Set when a profile field changed since the last CRM write; save_crm
+    # (or a node overlapping the write with its own I/O) clears it.
+    crm_dirty: bool = False
+
     # Booking
     booking: BookingRequest = Field(default_factory=BookingRequest)
 
+    # Turn-scoped: text of this turn's HumanMessage, resolved once by
+    # init_system so later nodes do not rescan messages.
+    last_human_text: str = ""
+    last_human_lower: str = ""
+    # Turn-scoped: "YYYY-MM-DD HH:MM" found in that text (None if absent).
+    parsed_datetime: str | None = None
+
+    # Turn-scoped: availability checked by crm_sync alongside the CRM lookup,
+    # reused by manage_booking in the same turn, cleared by init_system.
+    prefetched_availability: dict[str, Any] | None = None
+
     # Routing hint set by the router node
     intent: Literal[
         "greeting", "faq", "collect_data", "booking", "end_call", "unknown"
     ] = "unknown"
 
-    # Whether the system prompt has been injected into messages
+    # Whether the call's first turn has been initialized
     system_initialized: bool = False
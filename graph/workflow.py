@@ -3,41 +3,31 @@ Omvyx Voice — LangGraph Workflow (Entity Resolution Architecture)
 
 Intelligence Hub architecture:
 
-    ┌────────────────┐
-    │  init_system    │  ← injects system prompt once
-    └───────┬────────┘
-            ▼
-    ┌────────────────┐
-    │ universal_extract│  ← scans EVERY input for profile data
-    └───────┬────────┘
-            ▼
-    ┌────────────────┐
-    │   crm_sync     │  ← hydrates client_profile from CRM on first ID
-    └───────┬────────┘
-            ▼
-    ┌────────────────┐
-    │ checklist_router│  ← deterministic: skips known fields, routes
-    └───────┬────────┘
-            │ conditional edges
+    ┌──────────────────────────────────────────────┐
+    │ preprocess  (one fused node, four steps)     │
+    │   init_system        ← first-turn init       │
+    │   universal_extract  ← scans EVERY input     │
+    │   crm_sync           ← hydrates from CRM     │
+    │   checklist_router   ← skips known fields    │
+    └───────┬──────────────────────────────────────┘
+            │ conditional edges (greeting / end_call are answered
+            │ inline by the router and go straight to save_crm)
     ┌───────┼──────────┬──────────────┐
     ▼       ▼          ▼              ▼
-  greet  handle_faq  collect_data  manage_booking  end_call
-    │       │          │              │               │
-    └───────┴──────────┴──────────────┴───────────────┘
-                           ▼
-                   ┌────────────┐
-                   │  save_crm  │  ← UPDATE or INSERT guard
-                   └─────┬──────┘
-                         ▼
-                    ┌─────────┐
-                    │ respond  │ → END
-                    └─────────┘
+  (inline) handle_faq  collect_data  manage_booking
+    │       │          │              │
+    └───────┴──────────┴──────────────┘
+                    ▼
+            ┌────────────┐
+            │  save_crm  │  ← UPDATE or INSERT guard → END
+            └────────────┘
 
 CRITICAL — Persistence:
-    The graph is compiled with a MemorySaver checkpointer.  Every
+    The graph is compiled with a BoundedMemorySaver checkpointer.  Every
     invocation receives `config={"configurable": {"thread_id": call_id}}`
     so state is resumed from the exact point where the previous webhook
-    request left off.
+    request left off.  Callers pass `durability=CHECKPOINT_DURABILITY`
+    so the turn is checkpointed once, at the end of the run.
 
 NOTE:
     LangGraph passes state as a plain dict to node functions.
@@ -46,17 +36,22 @@ NOTE:
 
 from __future__ import annotations
 
+import asyncio
+import functools
 import logging
 import re
+import sys
+from collections.abc import Awaitable
+from dataclasses import asdict, fields, replace
 from typing import Any
 
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, StateGraph
 
+from graph.checkpointer import BoundedMemorySaver
 from graph.state import REQUIRED_FIELDS, BookingRequest, ClientProfile, OmvyxState
 from tools.calendar import book_slot, check_availability
-from tools.crm import create_user, lookup_user, update_user
+from tools.crm import UserRecord, create_user, lookup_user, update_user
 from tools.faq import search_faq
 
 logger = logging.getLogger("omvyx.workflow")
@@ -66,7 +61,7 @@ logger = logging.getLogger("omvyx.workflow")
 # System prompt — personality of the receptionist
 # ---------------------------------------------------------------------------
 
-SYSTEM_PROMPT = SystemMessage(content="""\
+_SYSTEM_PROMPT_TEXT = """\
 Eres Omvyx, una recepcionista virtual profesional y amable.
 Hablas en español de España de forma natural y cercana.
 
@@ -78,7 +73,20 @@ REGLAS:
 - Cuando ofrezcas citas alternativas, di las opciones de forma clara.
 - Si ya conoces al cliente (CRM), salúdale por su nombre y menciona su
   historial si es relevante.
-""")
+"""
+
+
+@functools.lru_cache(maxsize=1)
+def get_system_prompt() -> SystemMessage:
+    """
+    Build the SystemMessage on first use (not at import) and reuse it.
+
+    No node calls an LLM yet — every reply is templated — so nothing sends
+    the prompt today.  It is never stored in state (it would be
+    re-serialized into every checkpoint); an LLM call site should prepend
+    it to the messages in memory.
+    """
+    return SystemMessage(content=_SYSTEM_PROMPT_TEXT)
 
 
 # ---------------------------------------------------------------------------
@@ -91,13 +99,26 @@ FIELD_PROMPTS: dict[str, str] = {
     "intent": "¿En qué puedo ayudarle hoy? Puedo agendar una cita, resolver dudas o consultar información.",
 }
 
+# Lower-cased variants, spliced mid-sentence when resuming after a FAQ.
+FIELD_PROMPTS_LOWER: dict[str, str] = {k: v.lower() for k, v in FIELD_PROMPTS.items()}
+
 
 # ---------------------------------------------------------------------------
 # State access helpers
+#
+# Trust boundary: anything read back from graph state was written by our own
+# nodes and round-tripped through the LangGraph checkpointer, so it is
+# rebuilt as a plain dataclass (no validation).  Data coming from outside
+# the graph (CRM / calendar / Retell payloads) is never fed straight into a
+# state object — crm_sync merges CRM records field by field into
+# profile_data.
 # ---------------------------------------------------------------------------
 
+_BOOKING_DEFAULTS: dict[str, Any] = asdict(BookingRequest())
+
+
 def _get_profile(state: dict) -> ClientProfile:
-    """Reconstruct ClientProfile from the state dict."""
+    """Reconstruct ClientProfile from the state dict (treat as read-only)."""
     raw = state.get("client_profile")
     if isinstance(raw, ClientProfile):
         return raw
@@ -106,19 +127,64 @@ def _get_profile(state: dict) -> ClientProfile:
     return ClientProfile()
 
 
-def _get_booking(state: dict) -> BookingRequest:
-    """Reconstruct BookingRequest from the state dict."""
+def _get_booking(state: dict) -> dict[str, Any]:
+    """
+    Booking as a plain dict.  manage_booking writes dict literals shaped
+    like BookingRequest, which stays as the schema / documentation only.
+    Treat the result as read-only.
+    """
     raw = state.get("booking")
-    if isinstance(raw, BookingRequest):
-        return raw
     if isinstance(raw, dict):
-        return BookingRequest(**raw)
-    return BookingRequest()
+        return raw
+    if isinstance(raw, BookingRequest):
+        return asdict(raw)
+    return _BOOKING_DEFAULTS
+
+
+def _state_intent(state: dict) -> str:
+    """
+    Intent read back from state, interned.  Strings that round-trip through
+    the checkpointer are fresh objects; interning them lets the routing
+    checks against intent literals hit the identity fast path.
+    """
+    return sys.intern(state.get("intent") or "unknown")
 
 
 def _last_human_text(state: dict) -> str:
-    """Extract the text of the most recent HumanMessage."""
-    for m in reversed(state.get("messages", [])):
+    """
+    Text of the most recent HumanMessage.
+
+    init_system resolves it once per turn into state["last_human_text"];
+    every later step / node reads that instead of rescanning messages.
+    """
+    text = state.get("last_human_text")
+    if text is not None:
+        return text
+    return _scan_last_human_text(state.get("messages", []))
+
+
+def _last_human_lower(state: dict) -> str:
+    """last_human_text lowered — also resolved once per turn by init_system."""
+    lower = state.get("last_human_lower")
+    if lower is not None:
+        return lower
+    return _last_human_text(state).lower()
+
+
+def _parsed_datetime(state: dict) -> str | None:
+    """
+    "YYYY-MM-DD HH:MM" from this turn's utterance, or None.  Resolved once
+    per turn by init_system (state["parsed_datetime"]).
+    """
+    if "parsed_datetime" in state:
+        return state["parsed_datetime"]
+    m = _DATE_RE.search(_last_human_text(state))
+    return m.group(0) if m else None
+
+
+def _scan_last_human_text(messages: list) -> str:
+    """Reverse scan — the turn's HumanMessage is normally the last one."""
+    for m in reversed(messages):
         if isinstance(m, HumanMessage):
             return m.content
     return ""
@@ -128,115 +194,244 @@ def _last_human_text(state: dict) -> str:
 # Extraction helpers — pull structured data from free-text user utterances
 # ---------------------------------------------------------------------------
 
-def _extract_field_value(field: str, text: str) -> str | None:
+# Compiled once at import — these run on every user turn.
+_DNI_RE = re.compile(r"\b(\d{7,8}\s*[A-Za-z])\b")
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+")
+_PHONE_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_PHONE_TIME_RE = re.compile(r"\d{2}:\d{2}")
+# Matched against the pre-lowered utterance (no IGNORECASE); the captured
+# name is re-cased with .title() anyway.
+_NAME_RE = re.compile(r"(?:me llamo|soy|mi nombre es)\s+(.+)")
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}")
+
+# Name fallback: a bare utterance containing any of these (greetings,
+# data-providing phrases, common filler) is not taken as a name.
+_SKIP_WORDS: frozenset[str] = frozenset({
+    "hola", "buenos", "días", "dias", "buenas", "tardes", "noches",
+    "hey", "hello", "hi", "gracias", "adiós", "adios", "bye",
+    "sí", "si", "no", "vale", "ok", "bien", "perfecto", "genial",
+    "mi", "es", "dni", "documento", "identidad", "correo", "email",
+    "teléfono", "telefono", "número", "numero", "quiero", "una",
+    "cita", "para", "el", "la", "de", "por", "favor", "mejor",
+    "eso", "todo", "nada", "más", "mas",
+})
+
+# Every ASCII byte except digits and "+" — deleted in one bytes.translate()
+# pass (non-ASCII characters are already dropped by the ascii encode).
+_PHONE_DROP = bytes(c for c in range(128) if chr(c) not in "0123456789+")
+
+
+def _extract_field_value(
+    field: str,
+    text: str,
+    lower: str | None = None,
+    tokens: list[str] | None = None,
+) -> str | None:
     """
     Best-effort extraction of a slot value from the user's last message.
     In production you'd use an LLM function-call or NER model here.
+
+    `lower` (text.lower()) and `tokens` (text.split()) may be passed in when
+    the caller runs several extractors over the same utterance, so the
+    string is only lowered/split once per turn.
     """
     text = text.strip()
     if not text:
         return None
+    if lower is None:
+        lower = text.lower()
+    if tokens is None:
+        tokens = text.split()
 
     if field == "dni":
-        m = re.search(r"\b(\d{7,8}\s*[A-Za-z])\b", text)
+        m = _DNI_RE.search(text)
         return m.group(1).replace(" ", "").upper() if m else None
 
     if field == "email":
-        m = re.search(r"[\w.+-]+@[\w-]+\.[\w.]+", text)
-        return m.group(0).lower() if m else None
+        m = _EMAIL_RE.search(lower)
+        return m.group(0) if m else None
 
     if field == "phone":
-        # Strip date-like patterns before extracting digits
-        cleaned = re.sub(r"\d{4}-\d{2}-\d{2}", "", text)
-        cleaned = re.sub(r"\d{2}:\d{2}", "", cleaned)
-        digits = re.sub(r"[^\d+]", "", cleaned)
+        # Strip date-like patterns before extracting digits — each regex
+        # pass only runs when its separator is present at all
+        cleaned = _PHONE_DATE_RE.sub("", text) if "-" in text else text
+        if ":" in cleaned:
+            cleaned = _PHONE_TIME_RE.sub("", cleaned)
+        digits = cleaned.encode("ascii", "ignore").translate(None, _PHONE_DROP).decode()
         if len(digits) >= 9:
             return digits
         return None
 
     if field == "name":
         # Explicit patterns: "me llamo X", "soy X", "mi nombre es X"
-        name_patterns = [
-            r"(?:me llamo|soy|mi nombre es)\s+(.+)",
-        ]
-        for pat in name_patterns:
-            m = re.search(pat, text, re.IGNORECASE)
-            if m:
-                name_part = m.group(1).strip().rstrip(".")
-                words = [w for w in name_part.split() if w.isalpha()]
-                if words:
-                    return " ".join(words).title()
+        m = _NAME_RE.search(lower)
+        if m:
+            name_part = m.group(1).strip().rstrip(".")
+            parts = [w.capitalize() for w in name_part.split() if w.isalpha()]
+            if parts:
+                return " ".join(parts)
 
         # Fallback: accept if entire message looks like a name (≥2 words)
-        # Exclude greetings, data-providing phrases, and common filler
-        _SKIP_WORDS = {
-            "hola", "buenos", "días", "dias", "buenas", "tardes", "noches",
-            "hey", "hello", "hi", "gracias", "adiós", "adios", "bye",
-            "sí", "si", "no", "vale", "ok", "bien", "perfecto", "genial",
-            "mi", "es", "dni", "documento", "identidad", "correo", "email",
-            "teléfono", "telefono", "número", "numero", "quiero", "una",
-            "cita", "para", "el", "la", "de", "por", "favor", "mejor",
-            "eso", "todo", "nada", "más", "mas",
-        }
-        words = [w for w in text.split() if w.isalpha()]
+        parts = [w for w in tokens if w.isalpha()]
         # If any word is a "data" keyword, this isn't a name
-        if any(w.lower() in _SKIP_WORDS for w in words):
+        if any(w.lower() in _SKIP_WORDS for w in parts):
             return None
-        if 2 <= len(words) <= 4:
-            return " ".join(words).title()
-        if len(words) == 1 and len(words[0]) > 1:
-            return words[0].title()
+        if 2 <= len(parts) <= 4 or (len(parts) == 1 and len(parts[0]) > 1):
+            return " ".join(w.capitalize() for w in parts)
         return None
 
     return None
 
 
-def _detect_intent(text: str) -> str:
-    """Lightweight keyword-based intent classifier."""
-    t = text.lower()
+# Intent signals.  Each category is one alternation anchored at a word
+# start, so "ahora" does not trip "hora".  Plain signals must match a whole
+# word; a trailing "*" marks a stem that may run on — Spanish verbs take
+# attached pronouns ("reservarla", "agendarme", "cancelarla").
+def _keyword_re(*signals: str) -> re.Pattern[str]:
+    """One alternation per intent category — a single C-level scan."""
+    ordered = sorted(signals, key=len, reverse=True)
+    return re.compile(r"\b(?:" + "|".join(
+        re.escape(s[:-1]) + r"\w*" if s.endswith("*") else re.escape(s) + r"\b"
+        for s in ordered
+    ) + ")")
+
+
+_GREETING_RE = _keyword_re(
+    "hola", "hey", "hello", "buenos días", "buenas tardes", "buenas noches",
+)
+
+_FAQ_RE = _keyword_re(
+    "dónde", "donde", "ubicación", "dirección", "direcciones",
+    "horario*", "hora", "horas", "precio*", "costo*", "cancel*",
+    "seguro", "seguros", "parking", "location", "where", "address",
+    "hours", "price*", "insurance",
+)
+
+_BOOKING_RE = _keyword_re(
+    "cita", "citas", "reservar*", "agendar*", "appointment*", "book*",
+    "turno",
+)
+
+_BYE_RE = _keyword_re(
+    "adiós", "chao", "bye", "hasta luego", "nada más", "eso es todo",
+)
+
+
+def _detect_intent(
+    text: str,
+    lower: str | None = None,
+    tokens: list[str] | None = None,
+) -> str:
+    """
+    Lightweight keyword-based intent classifier.
+
+    Accepts the pre-lowered text and its whitespace tokens when the caller
+    already has them.
+    """
+    t = lower if lower is not None else text.lower()
+    if tokens is None:
+        tokens = text.split()
 
-    greetings = ["hola", "buenos días", "buenas tardes", "buenas noches", "hey", "hello"]
-    if any(g in t for g in greetings) and len(t.split()) <= 4:
+    if len(tokens) <= 4 and _GREETING_RE.search(t):
         return "greeting"
 
-    faq_signals = [
-        "dónde", "donde", "ubicación", "dirección", "horario", "hora",
-        "precio", "costo", "cancelar", "seguro", "parking", "location",
-        "where", "address", "hours", "price", "cancel", "insurance",
-    ]
-    if any(s in t for s in faq_signals):
+    if _FAQ_RE.search(t):
         return "faq"
 
-    booking_signals = ["cita", "reservar", "agendar", "appointment", "book", "turno"]
-    if any(s in t for s in booking_signals):
+    if _BOOKING_RE.search(t):
         return "booking"
 
-    bye_signals = ["adiós", "chao", "bye", "hasta luego", "nada más", "eso es todo"]
-    if any(s in t for s in bye_signals):
+    if _BYE_RE.search(t):
         return "end_call"
 
     return "collect_data"
 
 
-def _compute_missing_fields(profile: ClientProfile, intent: str) -> list[str]:
+# REQUIRED_FIELDS minus "intent" — intent is auto-detected every turn and
+# never asked for directly, so it can never be missing.
+_ASKABLE_FIELDS: tuple[str, ...] = tuple(f for f in REQUIRED_FIELDS if f != "intent")
+
+
+def _compute_missing_fields(profile: ClientProfile) -> list[str]:
     """
-    Deterministic checklist: iterate REQUIRED_FIELDS, skip any field
-    already present in client_profile.  This is the core of the entity
-    resolution — if CRM returned the name, it physically cannot appear
-    in the missing list.
+    Deterministic checklist: iterate _ASKABLE_FIELDS (REQUIRED_FIELDS minus
+    "intent", which the router derives), skip any field already present in
+    client_profile.  This is the core of the entity resolution — if CRM
+    returned the name, it physically cannot appear in the missing list.
     """
-    missing = []
-    for field in REQUIRED_FIELDS:
-        if field == "intent":
-            # "intent" is satisfied when user has expressed a clear purpose
-            if intent in ("booking", "faq", "end_call"):
-                continue
-            # If we already know what they want, skip
-            continue  # intent is auto-detected, never asked directly
-        value = profile.profile_data.get(field)
-        if not value:
-            missing.append(field)
-    return missing
+    profile_data = profile.profile_data
+    return [f for f in _ASKABLE_FIELDS if not profile_data.get(f)]
+
+
+# ---------------------------------------------------------------------------
+# Canned replies — greeting / goodbye are produced inline by checklist_router
+# (no dedicated node, so no extra node dispatch per turn)
+# ---------------------------------------------------------------------------
+
+def _greeting_text(profile: Any) -> str:
+    """Greeting — personalized if we know the client."""
+    name = profile.profile_data.get("name", "")
+
+    if profile.is_verified and name:
+        # Known customer — warm greeting with history context
+        history = profile.interaction_history
+        if history:
+            last_interaction = history[-1]
+            return (
+                f"¡Hola, {name}! Bienvenido/a de nuevo a Omvyx. "
+                f"Veo que su última visita fue el {last_interaction.get('date', '')} "
+                f"por {last_interaction.get('summary', 'una consulta')}. "
+                "¿En qué puedo ayudarle hoy?"
+            )
+        return f"¡Hola, {name}! Bienvenido/a de nuevo a Omvyx. ¿En qué puedo ayudarle hoy?"
+    if name:
+        return f"¡Hola, {name}! Bienvenido/a a Omvyx. ¿En qué puedo ayudarle hoy?"
+    return "¡Hola! Bienvenido/a a Omvyx. ¿En qué puedo ayudarle hoy?"
+
+
+def _goodbye_text(profile: Any) -> str:
+    """Polite goodbye."""
+    name = profile.profile_data.get("name", "")
+    if name:
+        return f"Ha sido un placer atenderle, {name}. ¡Hasta pronto!"
+    return "Gracias por llamar a Omvyx. ¡Hasta pronto!"
+
+
+# ---------------------------------------------------------------------------
+# CRM write-back — save_crm pushes the profile at the end of a turn, but
+# only while crm_dirty is set (some profile field changed since the last
+# write).  Nodes that already await an independent I/O call (FAQ lookup,
+# availability check) overlap that push with their own call instead and
+# clear crm_dirty, so save_crm does not repeat it.
+# ---------------------------------------------------------------------------
+
+async def _push_crm_update(profile: ClientProfile) -> None:
+    """UPDATE the CRM record of a verified client with the known fields."""
+    dni = profile.profile_data.get("dni", "")
+    await update_user(
+        dni,
+        name=profile.profile_data.get("name", ""),
+        email=profile.profile_data.get("email", ""),
+        phone=profile.profile_data.get("phone", ""),
+    )
+    logger.info("CRM UPDATE: %s", dni)
+
+
+async def _with_crm_update(
+    state: dict, profile: ClientProfile, call: Awaitable[Any],
+) -> tuple[Any, bool]:
+    """
+    Await `call`, running the CRM update concurrently when save_crm would
+    issue one this turn.  Returns (call result, whether the update ran).
+    """
+    if not (
+        state.get("crm_dirty")
+        and profile.is_verified
+        and profile.profile_data.get("dni")
+    ):
+        return await call, False
+    result, _ = await asyncio.gather(call, _push_crm_update(profile))
+    return result, True
 
 
 # ===================================================================
@@ -245,17 +440,34 @@ def _compute_missing_fields(profile: ClientProfile, intent: str) -> list[str]:
 
 async def init_system(state: dict) -> dict:
     """
-    Initialization node — injects the system prompt exactly once.
-    This prevents context pollution from prepending it on every webhook call.
-    """
-    if state.get("system_initialized"):
-        return {}
+    Initialization node — marks the call as initialized on its first turn.
+    The system prompt itself stays out of state (see get_system_prompt()).
 
-    return {
-        "messages": [SYSTEM_PROMPT],
-        "system_initialized": True,
+    Also resolves this turn's user utterance (last_human_text, plus its
+    lowered form) and the date/time it carries (parsed_datetime), and
+    clears turn-scoped scratch values (prefetched_availability) left over
+    from the previous webhook so they are never reused stale.
+    """
+    last_msg = _scan_last_human_text(state.get("messages", []))
+    date_match = _DATE_RE.search(last_msg)
+    updates: dict[str, Any] = {
+        "last_human_text": last_msg,
+        "last_human_lower": last_msg.lower(),
+        "parsed_datetime": date_match.group(0) if date_match else None,
     }
 
+    if state.get("prefetched_availability") is not None:
+        updates["prefetched_availability"] = None
+
+    if not state.get("system_initialized"):
+        updates["system_initialized"] = True
+
+    return updates
+
+
+# Profile fields universal_extract scans for, in extraction order.
+_EXTRACTABLE_FIELDS: tuple[str, ...] = ("dni", "name", "email", "phone")
+
 
 async def universal_extract(state: dict) -> dict:
     """
@@ -271,37 +483,61 @@ async def universal_extract(state: dict) -> dict:
     if not last_msg:
         return {}
 
-    profile = _get_profile(state).model_copy(deep=True)
+    profile = _get_profile(state)
+    profile_data = profile.profile_data
+
+    # Fully populated profile (typically CRM-hydrated): nothing to extract
+    if all(profile_data.get(f) for f in _EXTRACTABLE_FIELDS):
+        return {}
 
     # Scan for ALL extractable fields in every message
-    extractable_fields = ["dni", "name", "email", "phone"]
-    changed = False
+    found: dict[str, str] = {}
+
+    # Cheap pre-checks: skip extractors that cannot possibly match
+    # (a DNI needs 7+ digits, a phone 9+, an email an "@").
+    digit_count = sum(c.isdigit() for c in last_msg)
 
-    for field in extractable_fields:
+    # Lowered once per turn by init_system; split once and share across
+    # all extractors
+    lower = _last_human_lower(state)
+    tokens = last_msg.split()
+
+    for field in _EXTRACTABLE_FIELDS:
         # Only extract if not already known
-        if profile.profile_data.get(field):
+        if profile_data.get(field):
+            continue
+        if field == "dni" and digit_count < 7:
+            continue
+        if field == "phone" and digit_count < 9:
             continue
-        value = _extract_field_value(field, last_msg)
+        if field == "email" and "@" not in last_msg:
+            continue
+        value = _extract_field_value(field, last_msg, lower, tokens)
         if value:
-            profile.profile_data[field] = value
-            changed = True
+            found[field] = value
             logger.info("Extracted %s=%s", field, value)
 
-            # Set identity_key when we capture a unique identifier
-            if field == "dni" and not profile.identity_key:
-                profile.identity_key = value
-
-    if changed:
-        # Recompute missing fields
-        intent = state.get("intent", "unknown")
-        missing = _compute_missing_fields(profile, intent)
-        return {
-            "client_profile": profile,
-            "missing_required_fields": missing,
-        }
+    if found:
+        # Build the new profile from a fresh profile_data dict — no deep
+        # copy of the old profile, nothing mutated in place.
+        changes: dict[str, Any] = {"profile_data": {**profile_data, **found}}
+        # Set identity_key when we capture a unique identifier
+        if "dni" in found and not profile.identity_key:
+            changes["identity_key"] = found["dni"]
+        profile = replace(profile, **changes)
+
+        # missing_required_fields is recomputed by checklist_router, the
+        # last preprocess step — no need to do it here as well
+        return {"client_profile": profile, "crm_dirty": True}
     return {}
 
 
+# UserRecord fields merged into profile_data on a CRM hit
+_CRM_PROFILE_FIELDS = tuple(
+    f.name for f in fields(UserRecord) if f.name != "interaction_history"
+)
+
+
 async def crm_sync(state: dict) -> dict:
     """
     CRM Sync Node — the core of entity resolution.
@@ -313,6 +549,10 @@ async def crm_sync(state: dict) -> dict:
         from the DB.  This instantly marks those fields as "known" and
         the deterministic checklist router will skip them.
       - If customer does NOT exist: marks is_new_customer = True.
+
+    If the same utterance also carries a date ("mi DNI es X, quiero cita
+    para 2026-02-11 10:00"), availability is checked concurrently with the
+    CRM lookup and stashed in prefetched_availability for manage_booking.
     """
     profile = _get_profile(state)
 
@@ -324,40 +564,49 @@ async def crm_sync(state: dict) -> dict:
     if not dni:
         return {}
 
-    # Query CRM
-    crm_record = await lookup_user(dni)
+    # Query CRM — overlapped with the availability check when a date is present
+    updates: dict[str, Any] = {}
+    requested = _parsed_datetime(state)
+    if requested:
+        crm_record, availability = await asyncio.gather(
+            lookup_user(dni), check_availability(requested),
+        )
+        updates["prefetched_availability"] = availability
+    else:
+        crm_record = await lookup_user(dni)
 
     if crm_record:
         # HYDRATE — fill client_profile with all CRM data
-        hydrated = profile.model_copy(deep=True)
-        hydrated.identity_key = dni
-        hydrated.is_verified = True
-        hydrated.is_new_customer = False
-
         # Merge CRM data into profile_data (CRM wins for existing fields)
-        for key, value in crm_record.items():
-            if key == "interaction_history":
-                hydrated.interaction_history = value
-            elif value:
-                hydrated.profile_data[key] = value
-
-        # Recompute missing fields — CRM data makes fields "known"
-        missing = _compute_missing_fields(hydrated, state.get("intent", "unknown"))
+        profile_data = dict(profile.profile_data)
+        for key in _CRM_PROFILE_FIELDS:
+            value = getattr(crm_record, key)
+            if value:
+                profile_data[key] = value
+
+        hydrated = replace(
+            profile,
+            identity_key=dni,
+            is_verified=True,
+            is_new_customer=False,
+            profile_data=profile_data,
+            interaction_history=list(crm_record.interaction_history),
+        )
 
+        # CRM data makes fields "known"; checklist_router recomputes
+        # missing_required_fields from the hydrated profile
         logger.info(
-            "CRM HYDRATED: %s — fields filled from DB, missing=%s",
-            crm_record.get("name", dni), missing,
+            "CRM HYDRATED: %s — fields filled from DB", crm_record.name or dni,
         )
-        return {
-            "client_profile": hydrated,
-            "missing_required_fields": missing,
-        }
+        updates["client_profile"] = hydrated
+        return updates
     else:
         # New customer — mark as such
-        updated = profile.model_copy(deep=True)
-        updated.is_new_customer = True
+        updated = replace(profile, is_new_customer=True)
         logger.info("CRM MISS: DNI %s not found — new customer", dni)
-        return {"client_profile": updated}
+        updates["client_profile"] = updated
+        updates["crm_dirty"] = True
+        return updates
 
 
 async def checklist_router(state: dict) -> dict:
@@ -365,13 +614,19 @@ async def checklist_router(state: dict) -> dict:
     Deterministic Checklist Router — classifies intent and ensures the
     missing_required_fields list is up to date.
 
+    Greeting and goodbye turns are answered right here (the reply is a
+    template), and the conditional edge sends them straight to save_crm.
+
     The router iterates through REQUIRED_FIELDS and skips any field
     already present in client_profile.profile_data.  This is what makes
     the system behave like a human clerk: if CRM returned the name,
     the bot physically cannot route to the "Ask Name" node.
     """
     last_msg = _last_human_text(state)
-    intent = _detect_intent(last_msg) if last_msg else state.get("intent", "unknown")
+    intent = (
+        _detect_intent(last_msg, _last_human_lower(state))
+        if last_msg else _state_intent(state)
+    )
 
     profile = _get_profile(state)
     booking = _get_booking(state)
@@ -379,7 +634,7 @@ async def checklist_router(state: dict) -> dict:
     updates: dict[str, Any] = {"intent": intent}
 
     # Override intent when we're waiting for a booking response
-    if booking.status == "offered" and intent == "collect_data":
+    if booking["status"] == "offered" and intent == "collect_data":
         intent = "booking"
         updates["intent"] = intent
 
@@ -387,37 +642,51 @@ async def checklist_router(state: dict) -> dict:
     if intent == "faq" and state.get("current_slot"):
         updates["interrupted_by_faq"] = True
 
-    # Recompute missing fields
-    missing = _compute_missing_fields(profile, intent)
-    updates["missing_required_fields"] = missing
+    # Recompute missing fields — only emit when the list actually changed
+    missing = _compute_missing_fields(profile)
+    if missing != state.get("missing_required_fields"):
+        updates["missing_required_fields"] = missing
+
+    if intent == "greeting":
+        updates["messages"] = [AIMessage(content=_greeting_text(profile))]
+    elif intent == "end_call":
+        updates["messages"] = [AIMessage(content=_goodbye_text(profile))]
 
     return updates
 
 
-async def greet(state: dict) -> dict:
-    """Generate a greeting — personalized if we know the client."""
-    profile = _get_profile(state)
-    name = profile.profile_data.get("name", "")
+# The four entry steps run back-to-back inside one graph node: one node
+# dispatch and one state merge per turn instead of four.  Each step keeps
+# the node signature (state -> partial update) and sees the updates of the
+# steps before it.
+_PREPROCESS_STEPS = (init_system, universal_extract, crm_sync, checklist_router)
 
-    if profile.is_verified and name:
-        # Known customer — warm greeting with history context
-        history = profile.interaction_history
-        if history:
-            last_interaction = history[-1]
-            text = (
-                f"¡Hola, {name}! Bienvenido/a de nuevo a Omvyx. "
-                f"Veo que su última visita fue el {last_interaction.get('date', '')} "
-                f"por {last_interaction.get('summary', 'una consulta')}. "
-                "¿En qué puedo ayudarle hoy?"
-            )
-        else:
-            text = f"¡Hola, {name}! Bienvenido/a de nuevo a Omvyx. ¿En qué puedo ayudarle hoy?"
-    elif name:
-        text = f"¡Hola, {name}! Bienvenido/a a Omvyx. ¿En qué puedo ayudarle hoy?"
-    else:
-        text = "¡Hola! Bienvenido/a a Omvyx. ¿En qué puedo ayudarle hoy?"
 
-    return {"messages": [AIMessage(content=text)]}
+async def preprocess(state: dict) -> dict:
+    """
+    Fused entry node — init_system → universal_extract → crm_sync →
+    checklist_router.  Later keys overwrite earlier ones, except messages,
+    which accumulate as they would through the add_messages reducer.
+
+    The steps are CPU-only or await tools that return without suspending,
+    so the node yields to the event loop after each one — the server's
+    receive loop can read an interrupt and cancel the turn mid-node, as it
+    could at the node boundaries the fusion removed.
+    """
+    view = dict(state)
+    updates: dict[str, Any] = {}
+    for step in _PREPROCESS_STEPS:
+        step_updates = await step(view)
+        await asyncio.sleep(0)
+        if not step_updates:
+            continue
+        new_messages = step_updates.pop("messages", None)
+        if new_messages:
+            view["messages"] = [*view.get("messages", []), *new_messages]
+            updates["messages"] = [*updates.get("messages", []), *new_messages]
+        view.update(step_updates)
+        updates.update(step_updates)
+    return updates
 
 
 async def handle_faq(state: dict) -> dict:
@@ -427,7 +696,9 @@ async def handle_faq(state: dict) -> dict:
     """
     last_msg = _last_human_text(state)
 
-    answer = await search_faq(last_msg)
+    answer, synced = await _with_crm_update(
+        state, _get_profile(state), search_faq(last_msg),
+    )
     if not answer:
         answer = "Lo siento, no tengo información sobre eso. ¿Puedo ayudarle con algo más?"
 
@@ -435,12 +706,15 @@ async def handle_faq(state: dict) -> dict:
     missing = state.get("missing_required_fields", [])
     if state.get("interrupted_by_faq") and missing:
         next_field = missing[0]
-        answer += f" Pero volviendo a sus datos, {FIELD_PROMPTS[next_field].lower()}"
+        answer += f" Pero volviendo a sus datos, {FIELD_PROMPTS_LOWER[next_field]}"
 
-    return {
+    updates: dict[str, Any] = {
         "messages": [AIMessage(content=answer)],
         "interrupted_by_faq": False,
     }
+    if synced:
+        updates["crm_dirty"] = False
+    return updates
 
 
 async def collect_data(state: dict) -> dict:
@@ -502,13 +776,14 @@ async def manage_booking(state: dict) -> dict:
     booking = _get_booking(state)
 
     # Extract date from last message if not yet set
-    if not booking.requested_date:
-        last_msg = _last_human_text(state)
-        date_match = re.search(r"\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}", last_msg)
-        if date_match:
-            booking = BookingRequest(
-                requested_date=date_match.group(0), status="checking"
-            )
+    if not booking["requested_date"]:
+        requested = _parsed_datetime(state)
+        if requested:
+            booking = {
+                "requested_date": requested,
+                "confirmed_slot": None,
+                "status": "checking",
+            }
         else:
             text = (
                 "¿Para qué fecha y hora le gustaría la cita? "
@@ -517,29 +792,39 @@ async def manage_booking(state: dict) -> dict:
             return {"messages": [AIMessage(content=text)]}
 
     # Check availability
-    if booking.status == "checking":
-        result = await check_availability(booking.requested_date)
+    if booking["status"] == "checking":
+        requested = booking["requested_date"]
+        prefetched = state.get("prefetched_availability")
+        synced = False
+        if prefetched and prefetched.get("requested") == requested:
+            result = prefetched
+        else:
+            result, synced = await _with_crm_update(
+                state, profile, check_availability(requested),
+            )
         if result.get("available"):
             dni = profile.profile_data.get("dni", "")
-            await book_slot(booking.requested_date, dni)
-            booking = BookingRequest(
-                requested_date=booking.requested_date,
-                confirmed_slot=booking.requested_date,
-                status="confirmed",
-            )
+            await book_slot(requested, dni)
+            booking = {
+                "requested_date": requested,
+                "confirmed_slot": requested,
+                "status": "confirmed",
+            }
             text = (
                 f"¡Listo! Su cita ha quedado confirmada para el "
-                f"{booking.confirmed_slot}. ¿Necesita algo más?"
+                f"{requested}. ¿Necesita algo más?"
             )
         else:
             alts = result.get("alternatives", [])
-            booking = BookingRequest(
-                requested_date=booking.requested_date, status="offered"
-            )
+            booking = {
+                "requested_date": requested,
+                "confirmed_slot": None,
+                "status": "offered",
+            }
             if alts:
                 options = " o ".join(alts)
                 text = (
-                    f"Lo siento, el {booking.requested_date} no está disponible. "
+                    f"Lo siento, el {requested} no está disponible. "
                     f"Tengo disponibilidad el {options}. "
                     "¿Le viene bien alguna de estas opciones?"
                 )
@@ -547,26 +832,31 @@ async def manage_booking(state: dict) -> dict:
                 error = result.get("error", "No hay disponibilidad.")
                 text = f"Lo siento, {error} ¿Desea intentar otra fecha?"
 
-        return {
+        updates: dict[str, Any] = {
             "messages": [AIMessage(content=text)],
             "booking": booking,
         }
+        if synced:
+            updates["crm_dirty"] = False
+        return updates
 
     # If we offered alternatives and user responds
-    if booking.status == "offered":
-        last_msg = _last_human_text(state)
-        date_match = re.search(r"\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}", last_msg)
-        if date_match:
-            slot = date_match.group(0)
-            result = await check_availability(slot)
+    if booking["status"] == "offered":
+        slot = _parsed_datetime(state)
+        if slot:
+            # Always re-check: the slot may have been taken since it was
+            # offered, and book_slot does not refuse a busy slot.
+            result, synced = await _with_crm_update(
+                state, profile, check_availability(slot),
+            )
             if result.get("available"):
                 dni = profile.profile_data.get("dni", "")
                 await book_slot(slot, dni)
-                booking = BookingRequest(
-                    requested_date=slot,
-                    confirmed_slot=slot,
-                    status="confirmed",
-                )
+                booking = {
+                    "requested_date": slot,
+                    "confirmed_slot": slot,
+                    "status": "confirmed",
+                }
                 text = (
                     f"¡Perfecto! Cita confirmada para el {slot}. "
                     "¿Algo más en lo que pueda ayudarle?"
@@ -574,40 +864,38 @@ async def manage_booking(state: dict) -> dict:
             else:
                 text = "Ese horario tampoco está disponible. ¿Quiere probar otra fecha?"
         else:
-            booking = BookingRequest(status="idle")
+            synced = False
+            booking = dict(_BOOKING_DEFAULTS)
             text = "Entendido. ¿Para qué fecha y hora le gustaría la cita?"
 
-        return {
+        updates = {
             "messages": [AIMessage(content=text)],
             "booking": booking,
         }
+        if synced:
+            updates["crm_dirty"] = False
+        return updates
 
     # Fallback
     return {
         "messages": [AIMessage(content="¿Le gustaría reservar una cita? Dígame la fecha y hora deseada.")],
-        "booking": BookingRequest(status="idle"),
+        "booking": dict(_BOOKING_DEFAULTS),
     }
 
 
-async def end_call(state: dict) -> dict:
-    """Polite goodbye."""
-    profile = _get_profile(state)
-    name = profile.profile_data.get("name", "")
-    if name:
-        text = f"Ha sido un placer atenderle, {name}. ¡Hasta pronto!"
-    else:
-        text = "Gracias por llamar a Omvyx. ¡Hasta pronto!"
-    return {"messages": [AIMessage(content=text)]}
-
-
 async def save_crm(state: dict) -> dict:
     """
     Business Logic Guard — Duplicate Registration Prevention.
 
+    Runs only while crm_dirty is set — a turn that changed nothing ("gracias")
+    costs no CRM round trip.
     If is_verified is True → UPDATE (client already exists in CRM).
     If is_new_customer is True → INSERT (new client).
-    This runs before the final respond node to ensure CRM is in sync.
+    This is the last node of every turn, so CRM is in sync before END.
     """
+    if not state.get("crm_dirty"):
+        return {}
+
     profile = _get_profile(state)
     dni = profile.profile_data.get("dni")
 
@@ -615,16 +903,10 @@ async def save_crm(state: dict) -> dict:
     if not dni:
         return {}
 
-    # Skip if already verified and no new data to push
     if profile.is_verified:
         # UPDATE — push any newly collected fields back to CRM
-        await update_user(
-            dni,
-            name=profile.profile_data.get("name", ""),
-            email=profile.profile_data.get("email", ""),
-            phone=profile.profile_data.get("phone", ""),
-        )
-        logger.info("CRM UPDATE: %s", dni)
+        await _push_crm_update(profile)
+        return {"crm_dirty": False}
     elif profile.is_new_customer and profile.profile_data.get("name"):
         # INSERT — only when we have at minimum DNI + name
         await create_user(
@@ -634,45 +916,20 @@ async def save_crm(state: dict) -> dict:
             phone=profile.profile_data.get("phone", ""),
         )
         # Mark as verified now that they're in the system
-        updated = profile.model_copy(deep=True)
-        updated.is_verified = True
-        updated.is_new_customer = False
+        updated = replace(profile, is_verified=True, is_new_customer=False)
         logger.info("CRM INSERT: %s", dni)
-        return {"client_profile": updated}
+        return {"client_profile": updated, "crm_dirty": False}
 
     return {}
 
 
-async def respond(state: dict) -> dict:
-    """
-    Terminal passthrough — clean convergence point before END.
-    The actual response message was already appended by the preceding node.
-    """
-    return {}
-
-
 # ===================================================================
 # ROUTING LOGIC
 # ===================================================================
 
-def route_after_init(state: dict) -> str:
-    """Always proceed to universal extraction."""
-    return "universal_extract"
-
-
-def route_after_extract(state: dict) -> str:
-    """Always proceed to CRM sync."""
-    return "crm_sync"
-
-
-def route_after_crm_sync(state: dict) -> str:
-    """Always proceed to checklist router."""
-    return "checklist_router"
-
-
 def route_after_checklist(state: dict) -> str:
-    """Conditional edge from checklist_router → next node."""
-    intent = state.get("intent", "unknown")
+    """Conditional edge from preprocess (checklist_router step) → next node."""
+    intent = _state_intent(state)
     missing = state.get("missing_required_fields", [])
 
     # If slot-filling is active and user didn't ask a FAQ or booking,
@@ -689,14 +946,27 @@ def route_after_collect(state: dict) -> str:
 
 def route_after_booking(state: dict) -> str:
     """After manage_booking, redirect to collect_data if intent was changed."""
-    if state.get("intent") == "collect_data":
+    if _state_intent(state) == "collect_data":
         return "collect_data"
     return "save_crm"
 
 
-def route_after_save(state: dict) -> str:
-    """After save_crm, always go to respond."""
-    return "respond"
+def turn_reply(update: dict | None) -> str | None:
+    """
+    The turn's spoken reply, if this node update (stream_mode="updates")
+    carries it — lets callers answer before save_crm finishes the turn.
+
+    Every node that emits an AIMessage ends the turn with it, except
+    manage_booking's hand-off to collect_data (intent="collect_data", see
+    route_after_booking), whose message is superseded by collect_data's.
+    """
+    if not update:
+        return None
+    messages = update.get("messages")
+    if not messages or update.get("intent") == "collect_data":
+        return None
+    last = messages[-1]
+    return last.content if isinstance(last, AIMessage) else None
 
 
 # ===================================================================
@@ -710,44 +980,31 @@ def build_graph() -> StateGraph:
     builder = StateGraph(OmvyxState)
 
     # --- Nodes ---
-    builder.add_node("init_system", init_system)
-    builder.add_node("universal_extract", universal_extract)
-    builder.add_node("crm_sync", crm_sync)
-    builder.add_node("checklist_router", checklist_router)
-    builder.add_node("greet", greet)
+    builder.add_node("preprocess", preprocess)
     builder.add_node("handle_faq", handle_faq)
     builder.add_node("collect_data", collect_data)
     builder.add_node("manage_booking", manage_booking)
-    builder.add_node("end_call", end_call)
     builder.add_node("save_crm", save_crm)
-    builder.add_node("respond", respond)
 
     # --- Entry ---
-    builder.set_entry_point("init_system")
-
-    # --- Pipeline: init → extract → crm_sync → checklist_router ---
-    builder.add_edge("init_system", "universal_extract")
-    builder.add_edge("universal_extract", "crm_sync")
-    builder.add_edge("crm_sync", "checklist_router")
+    builder.set_entry_point("preprocess")
 
-    # --- Conditional edges from checklist_router ---
+    # --- Conditional edges from preprocess (checklist_router step) ---
     builder.add_conditional_edges(
-        "checklist_router",
+        "preprocess",
         route_after_checklist,
         {
-            "greeting": "greet",
+            "greeting": "save_crm",
             "faq": "handle_faq",
             "collect_data": "collect_data",
             "booking": "manage_booking",
-            "end_call": "end_call",
+            "end_call": "save_crm",
             "unknown": "collect_data",
         },
     )
 
-    # --- Edges from action nodes → save_crm → respond → END ---
-    builder.add_edge("greet", "save_crm")
+    # --- Edges from action nodes → save_crm → END ---
     builder.add_edge("handle_faq", "save_crm")
-    builder.add_edge("end_call", "save_crm")
 
     builder.add_conditional_edges(
         "collect_data",
@@ -764,24 +1021,62 @@ def build_graph() -> StateGraph:
         },
     )
 
-    builder.add_edge("save_crm", "respond")
-    builder.add_edge("respond", END)
+    builder.add_edge("save_crm", END)
 
     return builder
 
 
+# Checkpoint durability for every invocation.  "exit" persists state once,
+# when the run finishes, instead of after every node — one checkpointer
+# write per webhook turn.  A run that is cancelled mid-way (Retell
+# interrupt) leaves the previous turn's checkpoint untouched.
+CHECKPOINT_DURABILITY = "exit"
+
+
+@functools.lru_cache(maxsize=1)
+def _shared_builder() -> StateGraph:
+    """
+    Graph topology is static — build it once per process.  build_graph()
+    still returns a fresh builder for callers that want to extend it.
+    """
+    return build_graph()
+
+
+@functools.lru_cache(maxsize=4)
+def _compile_with(checkpointer):
+    """Compile the shared builder, memoized per checkpointer instance."""
+    return _shared_builder().compile(checkpointer=checkpointer)
+
+
 def compile_graph(checkpointer=None):
     """
     Build and compile the graph with checkpointing.
 
     Args:
         checkpointer: A LangGraph checkpointer instance.  Defaults to
-                      MemorySaver (in-memory, fine for dev/single-process).
+                      BoundedMemorySaver (in-memory, bounded; fine for
+                      dev/single-process).
                       For production, pass AsyncSqliteSaver or a Redis-backed
                       checkpointer.
+
+    Compiling against the same checkpointer twice returns the same compiled
+    graph.  The default path gets a fresh BoundedMemorySaver (and so a fresh
+    graph) on every call, compiled from the cached topology but not
+    memoized — a cache entry could never be hit again and would only keep
+    that saver's conversations alive.
     """
     if checkpointer is None:
-        checkpointer = MemorySaver()
+        return _shared_builder().compile(checkpointer=BoundedMemorySaver())
+
+    return _compile_with(checkpointer)
+
 
-    builder = build_graph()
-    return builder.compile(checkpointer=checkpointer)
+@functools.lru_cache(maxsize=1)
+def get_graph():
+    """
+    Process-wide compiled graph (default BoundedMemorySaver).  Compiled on
+    first use, so importing this module stays cheap; request handlers should
+    call this instead of compile_graph(), which hands out a new checkpointer
+    (and so a fresh, empty conversation store) every time.
+    """
+    return compile_graph()
@@ -5,25 +5,28 @@ Exposes a WebSocket /retell-webhook endpoint that handles real-time
 bidirectional communication with Retell AI.
 
 Architecture:
-    - NON-BLOCKING: Graph inference runs in asyncio.create_task(), never
-      blocking the main receive loop.  This allows the loop to process
+    - NON-BLOCKING: Graph inference runs on a per-connection worker task,
+      never blocking the main receive loop.  This allows the loop to process
       interrupt signals immediately.
     - The Retell call_id is used as LangGraph's thread_id so the
       checkpointer restores full conversation state across turns.
-    - System prompt is injected INSIDE the graph (init_system node),
-      NOT prepended on every webhook call — preventing context pollution.
+    - The system prompt lives in the graph module (get_system_prompt()),
+      NOT in the webhook payload or the checkpointed history.  No node
+      calls an LLM yet, so it is currently unused.
 """
 
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
+import socket
+from collections.abc import Awaitable, Callable
 
+import orjson
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from langchain_core.messages import HumanMessage
 
-from graph.workflow import compile_graph
+from graph.workflow import CHECKPOINT_DURABILITY, get_graph, turn_reply
 
 # ---------------------------------------------------------------------------
 # Logging
@@ -37,7 +40,125 @@ logger = logging.getLogger("omvyx")
 # ---------------------------------------------------------------------------
 
 app = FastAPI(title="Omvyx Voice", version="2.0.0")
-graph = compile_graph()  # single process — MemorySaver is fine
+graph = get_graph()  # single process — in-memory BoundedMemorySaver is fine
+
+# ---------------------------------------------------------------------------
+# JSON framing — orjson on every frame (the receive loop's hottest CPU cost)
+# ---------------------------------------------------------------------------
+
+
+def _json_frame(payload: dict) -> str:
+    """Serialize with orjson into a text frame (what Retell expects)."""
+    return orjson.dumps(payload).decode()
+
+
+# ping_pong replies have a fixed shape — only the echoed timestamp varies
+_PING_PREFIX = '{"interaction_type":"ping_pong","timestamp":'
+_PING_SUFFIX = "}"
+
+
+def _pong_frame(timestamp: object) -> str:
+    """Echo a Retell ping without serializing a dict for the common case."""
+    if type(timestamp) is int:
+        return _PING_PREFIX + str(timestamp) + _PING_SUFFIX
+    return _json_frame({"interaction_type": "ping_pong", "timestamp": timestamp})
+
+
+# Frames queued per connection before senders wait on the writer
+_SEND_QUEUE_SIZE = 32
+
+
+async def _writer_loop(ws: WebSocket, send_q: asyncio.Queue[str]) -> None:
+    """
+    The connection's only sender: writes queued frames in order, so the
+    receive loop and generation turns never await a drain themselves.
+
+    On a send failure the writer logs it, frees the queue (waking any
+    sender blocked on a full queue) and closes the socket, which ends the
+    receive loop; senders refuse new frames once the writer is done.
+    """
+    try:
+        while True:
+            await ws.send_text(await send_q.get())
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        logger.exception("WebSocket send failed")
+        while not send_q.empty():
+            send_q.get_nowait()
+        try:
+            await ws.close(code=1011)
+        except Exception:
+            logger.debug("WebSocket close failed", exc_info=True)
+
+
+# ---------------------------------------------------------------------------
+# Socket tuning
+# ---------------------------------------------------------------------------
+
+
+def _transport(ws: WebSocket) -> asyncio.Transport | None:
+    """
+    The server transport behind `ws`, or None.  ASGI does not expose it, but
+    every uvicorn WebSocket protocol hands the app a bound receive method
+    and keeps the transport on `self.transport`.
+    """
+    protocol = getattr(getattr(ws, "_receive", None), "__self__", None)
+    return getattr(protocol, "transport", None)
+
+
+# Write buffer water marks: a long reply or a burst of frames is handed to
+# the kernel's TCP buffer instead of pausing the sender at asyncio's
+# default 64 KiB high-water mark.
+_WRITE_BUFFER_HIGH = 1 << 20
+_WRITE_BUFFER_LOW = 1 << 16
+
+
+def _tune_socket(ws: WebSocket) -> None:
+    """
+    TCP_NODELAY so back-to-back small frames are never held by Nagle
+    (asyncio / uvloop normally set it already — this makes it explicit),
+    SO_KEEPALIVE so a vanished Retell peer is eventually detected, and
+    larger transport write buffer limits.
+    Best effort: skipped when the transport or socket is not reachable.
+    """
+    transport = _transport(ws)
+    if transport is None:
+        return
+    if hasattr(transport, "set_write_buffer_limits"):
+        transport.set_write_buffer_limits(
+            high=_WRITE_BUFFER_HIGH, low=_WRITE_BUFFER_LOW,
+        )
+    sock = transport.get_extra_info("socket")
+    if sock is None:
+        return
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    except OSError:
+        logger.debug("Socket tuning unavailable", exc_info=True)
+
+
+# ---------------------------------------------------------------------------
+# Transcript access
+# ---------------------------------------------------------------------------
+
+
+def _last_user_text(transcript: list[dict]) -> str:
+    """
+    Last user utterance in a Retell transcript.  Retell resends the whole
+    transcript on every event and the user turn that triggered it is almost
+    always the final (or, after an agent backchannel, second-to-last)
+    entry — check those before falling back to a full reverse scan.
+    """
+    for turn in transcript[-2:][::-1]:
+        if turn.get("role") == "user":
+            return turn.get("content", "")
+    for turn in reversed(transcript[:-2]):
+        if turn.get("role") == "user":
+            return turn.get("content", "")
+    return ""
+
 
 # ---------------------------------------------------------------------------
 # Health check
@@ -65,16 +186,52 @@ async def retell_websocket(ws: WebSocket, call_id: str):
 
     NON-BLOCKING ARCHITECTURE:
         The main while-loop only reads incoming WebSocket frames and
-        dispatches work.  All graph inference runs inside asyncio.Task
-        objects so the loop is always free to process interrupts.
+        queues work for the connection's generation worker, so the loop is
+        always free to process interrupts.
     """
     await ws.accept()
+    _tune_socket(ws)
     logger.info("WebSocket connected — call_id=%s", call_id)
 
-    current_task: asyncio.Task | None = None
+    # The graph bound to this call's thread (checkpointer persistence),
+    # built once per connection instead of a config dict per turn
+    call_graph = graph.with_config(configurable={"thread_id": call_id})
+
+    # All outgoing frames go through one writer task
+    send_q: asyncio.Queue[str] = asyncio.Queue(maxsize=_SEND_QUEUE_SIZE)
+    writer_task = asyncio.create_task(_writer_loop(ws, send_q))
+
+    async def send(frame: str) -> None:
+        if writer_task.done():
+            raise RuntimeError("WebSocket writer stopped")
+        await send_q.put(frame)
+
+    # One generation worker per connection, fed by a single-slot queue:
+    # only the newest request matters, so a newer one replaces a queued one.
+    # The worker runs turns strictly one after another, so each turn resumes
+    # from the previous turn's checkpoint.
+    pending: asyncio.Queue[tuple[list[dict], int]] = asyncio.Queue(maxsize=1)
+    turn: asyncio.Task | None = None
+    replied = False
+
+    def interrupt() -> None:
+        """
+        Abort the in-flight turn — unless it has already answered.  A turn
+        that has replied keeps running (save_crm, checkpoint write) while
+        Retell plays the reply; cancelling it with durability="exit" would
+        drop state the caller has already heard about.
+        """
+        if turn is not None and not turn.done() and not replied:
+            turn.cancel()
+
+    def request_generation(transcript: list[dict], response_id: int) -> None:
+        interrupt()
+        if pending.full():
+            pending.get_nowait()
+        pending.put_nowait((transcript, response_id))
 
     # ---------------------------------------------------------------
-    # Generation handler — runs inside its own asyncio.Task
+    # Generation handler — one turn, run by the worker as its own task
     # ---------------------------------------------------------------
 
     async def handle_generation(
@@ -85,57 +242,51 @@ async def retell_websocket(ws: WebSocket, call_id: str):
         """
         Run the LangGraph workflow and send the response to Retell.
 
-        CLEAN HISTORY: The system prompt is injected by the graph's
-        init_system node on the first invocation.  Subsequent calls
-        only send the HumanMessage — no SYSTEM_PROMPT prepend.
+        STREAMING: the graph runs with stream_mode="updates" and the reply
+        is sent as soon as the node that produces it finishes, instead of
+        after the whole run (save_crm still runs behind it).
+
+        CLEAN HISTORY: The system prompt is never sent or stored (no node
+        calls an LLM yet).  Every call only sends the HumanMessage.
         """
-        try:
-            # Extract last user utterance from transcript
-            user_text = ""
-            for turn in reversed(transcript):
-                if turn.get("role") == "user":
-                    user_text = turn.get("content", "")
-                    break
 
-            if not user_text:
-                user_text = "Hola"
+        async def send_reply(text: str) -> None:
+            nonlocal replied
+            # Whole reply + completion in a single frame (an empty reply
+            # still gets its completion frame)
+            await send(_json_frame({
+                "response_id": response_id,
+                "content": text,
+                "content_complete": True,
+            }))
+            replied = True
+            logger.info("Response — call_id=%s reply=%s", cid, text[:80])
 
-            # Config with thread_id for checkpointer persistence
-            config = {"configurable": {"thread_id": cid}}
+        try:
+            user_text = _last_user_text(transcript) or "Hola"
 
             # Input state: ONLY the user message + call_id.
-            # System prompt is handled inside the graph (init_system node).
+            # The system prompt is never part of the input or stored state.
             input_state = {
                 "messages": [HumanMessage(content=user_text)],
                 "call_id": cid,
             }
 
-            # Run the graph
-            result = await graph.ainvoke(input_state, config=config)
-
-            # Extract the last AI message as the agent reply
-            agent_reply = ""
-            for msg in reversed(result.get("messages", [])):
-                if hasattr(msg, "content") and msg.type == "ai":
-                    agent_reply = msg.content
-                    break
-
-            logger.info("Response — call_id=%s reply=%s", cid, agent_reply[:80])
-
-            # Send content chunk to Retell
-            if agent_reply:
-                await ws.send_json({
-                    "response_id": response_id,
-                    "content": agent_reply,
-                    "content_complete": False,
-                })
-
-            # Signal stream completion
-            await ws.send_json({
-                "response_id": response_id,
-                "content": "",
-                "content_complete": True,
-            })
+            # Checkpointed once, when the run completes
+            async for chunk in call_graph.astream(
+                input_state,
+                stream_mode="updates",
+                durability=CHECKPOINT_DURABILITY,
+            ):
+                if replied:
+                    continue
+                for update in chunk.values():
+                    reply = turn_reply(update)
+                    if reply is not None:
+                        await send_reply(reply)
+                        break
+            if not replied:
+                await send_reply("")
 
         except asyncio.CancelledError:
             logger.info(
@@ -146,6 +297,55 @@ async def retell_websocket(ws: WebSocket, call_id: str):
         except Exception:
             logger.exception("Generation error — call_id=%s", cid)
 
+    async def worker() -> None:
+        nonlocal turn, replied
+        while True:
+            transcript, response_id = await pending.get()
+            replied = False
+            turn = asyncio.create_task(
+                handle_generation(transcript, response_id, call_id)
+            )
+            # wait() never raises, so a cancelled turn doesn't stop the worker
+            await asyncio.wait((turn,))
+
+    worker_task = asyncio.create_task(worker())
+
+    # ---------------------------------------------------------------
+    # Frame handlers
+    # ---------------------------------------------------------------
+
+    async def on_ping(data: dict) -> None:
+        await send(_pong_frame(data.get("timestamp", 0)))
+
+    async def on_call_details(data: dict) -> None:
+        logger.info("Call started — call_id=%s", call_id)
+        if data.get("initiator", "") == "agent":
+            request_generation([], 0)
+
+    async def on_response_required(data: dict) -> None:
+        # Also serves reminder_required — same payload, same handling
+        request_generation(
+            data.get("transcript", []),
+            data.get("response_id", 0),
+        )
+
+    async def on_interrupt(data: dict) -> None:
+        interrupt()
+        logger.info("Interrupt received — call_id=%s", call_id)
+
+    # Keyed by interaction_type, or for event-style frames by the event
+    # name (interaction_begin) / (event, type) pair (interaction_update).
+    handlers: dict[str | tuple[str, str], Callable[[dict], Awaitable[None]]] = {
+        "ping_pong": on_ping,
+        "call_details": on_call_details,
+        "response_required": on_response_required,
+        "reminder_required": on_response_required,
+        "update_only": on_interrupt,
+        "interaction_begin": on_call_details,
+        ("interaction_update", "response_required"): on_response_required,
+        ("interaction_update", "interrupt"): on_interrupt,
+    }
+
     # ---------------------------------------------------------------
     # Main receive loop
     # ---------------------------------------------------------------
@@ -153,78 +353,27 @@ async def retell_websocket(ws: WebSocket, call_id: str):
     try:
         while True:
             raw = await ws.receive_text()
-            data: dict = json.loads(raw)
-
-            interaction_type = data.get("interaction_type", "")
-            event = data.get("event", "")
-            update_type = data.get("type", "")
-
-            # ========= INTERACTION BEGIN / CALL DETAILS =========
-            if interaction_type == "call_details" or event == "interaction_begin":
-                logger.info("Call started — call_id=%s", call_id)
-
-                initiator = data.get("initiator", "")
-                if initiator == "agent":
-                    current_task = asyncio.create_task(
-                        handle_generation([], 0, call_id)
-                    )
-
-            # ========= RESPONSE REQUIRED =========
-            elif (
-                interaction_type == "response_required"
-                or (event == "interaction_update" and update_type == "response_required")
-            ):
-                if current_task and not current_task.done():
-                    current_task.cancel()
-
-                transcript = data.get("transcript", [])
-                response_id = data.get("response_id", 0)
-
-                current_task = asyncio.create_task(
-                    handle_generation(
-                        transcript,
-                        response_id,
-                        call_id,
-                    )
+            data: dict = orjson.loads(raw)
+
+            # interaction_type first — ping_pong, the most frequent frame,
+            # resolves in one lookup
+            handler = handlers.get(data.get("interaction_type", ""))
+            if handler is None:
+                event = data.get("event", "")
+                handler = handlers.get(event) or handlers.get(
+                    (event, data.get("type", ""))
                 )
-
-            # ========= INTERRUPT =========
-            elif (
-                interaction_type == "update_only"
-                or (event == "interaction_update" and update_type == "interrupt")
-            ):
-                if current_task and not current_task.done():
-                    current_task.cancel()
-                logger.info("Interrupt received — call_id=%s", call_id)
-
-            # ========= REMINDER REQUIRED =========
-            elif interaction_type == "reminder_required":
-                if current_task and not current_task.done():
-                    current_task.cancel()
-
-                response_id = data.get("response_id", 0)
-                current_task = asyncio.create_task(
-                    handle_generation(
-                        data.get("transcript", []),
-                        response_id,
-                        call_id,
-                    )
-                )
-
-            # ========= PING / PONG =========
-            elif interaction_type == "ping_pong":
-                await ws.send_json({
-                    "interaction_type": "ping_pong",
-                    "timestamp": data.get("timestamp", 0),
-                })
+            if handler is not None:
+                await handler(data)
 
     except WebSocketDisconnect:
         logger.info("WebSocket disconnected — call_id=%s", call_id)
     except Exception:
         logger.exception("WebSocket error — call_id=%s", call_id)
     finally:
-        if current_task and not current_task.done():
-            current_task.cancel()
+        worker_task.cancel()
+        writer_task.cancel()
+        interrupt()
 
 
 # ---------------------------------------------------------------------------
@@ -232,6 +381,20 @@ async def retell_websocket(ws: WebSocket, call_id: str):
 # ---------------------------------------------------------------------------
 
 if __name__ == "__main__":
+    import sys
+
     import uvicorn
 
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    # "auto" picks uvloop + httptools (shipped with uvicorn[standard]) over
+    # the stdlib event loop / h11 parser when they are installed — uvloop
+    # is not available on Windows or PyPy.  Auto-reload runs the app under
+    # a file watcher — opt in with --reload during development only.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        reload="--reload" in sys.argv,
+        loop="auto",
+        http="auto",
+        workers=1,
+    )
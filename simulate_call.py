@@ -25,11 +25,17 @@ Usage:
 from __future__ import annotations
 
 import asyncio
+import dataclasses
 import sys
 
 from langchain_core.messages import AIMessage, HumanMessage
 
-from graph.workflow import compile_graph
+from graph.workflow import CHECKPOINT_DURABILITY, get_graph
+
+try:
+    from uvloop import run as run_loop  # same event loop as the server
+except ImportError:  # uvloop is not available on Windows
+    run_loop = asyncio.run
 
 
 # ---------------------------------------------------------------------------
@@ -47,14 +53,17 @@ def _last_ai_message(result: dict) -> str:
     return "(no response)"
 
 
-async def send(graph, text: str, *, config: dict, call_id: str) -> str:
-    """Send a user utterance and return the agent reply."""
-    result = await graph.ainvoke(
+async def send(bound, text: str, *, call_id: str) -> str:
+    """
+    Send a user utterance and return the agent reply.  `bound` is the graph
+    with the call's thread config already bound (graph.with_config).
+    """
+    result = await bound.ainvoke(
         {
             "messages": [HumanMessage(content=text)],
             "call_id": call_id,
         },
-        config=config,
+        durability=CHECKPOINT_DURABILITY,
     )
     return _last_ai_message(result)
 
@@ -68,8 +77,8 @@ def banner(title: str):
 def print_state(vals: dict):
     """Pretty-print the final state snapshot."""
     profile = vals.get("client_profile", {})
-    if hasattr(profile, "model_dump"):
-        profile = profile.model_dump()
+    if dataclasses.is_dataclass(profile):
+        profile = dataclasses.asdict(profile)
     print(f"  client_profile:")
     print(f"    identity_key       : {profile.get('identity_key')}")
     print(f"    is_verified        : {profile.get('is_verified')}")
@@ -81,8 +90,8 @@ def print_state(vals: dict):
         print(f"      - {h}")
     print(f"  missing_required     : {vals.get('missing_required_fields')}")
     booking = vals.get("booking", {})
-    if hasattr(booking, "model_dump"):
-        booking = booking.model_dump()
+    if dataclasses.is_dataclass(booking):
+        booking = dataclasses.asdict(booking)
     print(f"  booking              : {booking}")
 
 
@@ -114,13 +123,14 @@ SCENARIO_KNOWN: list[tuple[str, str]] = [
 
 async def run_scenario(name: str, scenario: list, call_id: str):
     banner(f"OMVYX VOICE — {name}")
-    graph = compile_graph()
+    graph = get_graph()
     config = {"configurable": {"thread_id": call_id}}
+    bound = graph.with_config(config)
 
     for label, utterance in scenario:
         print(f"\n--- {label} ---")
         print(f"  USER : {utterance}")
-        reply = await send(graph, utterance, config=config, call_id=call_id)
+        reply = await send(bound, utterance, call_id=call_id)
         print(f"  AGENT: {reply}")
 
     # Print final state
@@ -138,9 +148,10 @@ async def run_scenario(name: str, scenario: list, call_id: str):
 
 async def run_interactive():
     banner("OMVYX VOICE — Interactive Mode (type 'quit' to exit)")
-    graph = compile_graph()
+    graph = get_graph()
     call_id = "sim-interactive"
     config = {"configurable": {"thread_id": call_id}}
+    bound = graph.with_config(config)
 
     while True:
         try:
@@ -153,7 +164,7 @@ async def run_interactive():
         if not text:
             continue
 
-        reply = await send(graph, text, config=config, call_id=call_id)
+        reply = await send(bound, text, call_id=call_id)
         print(f"  OMVYX: {reply}")
 
     # Show final state
@@ -170,8 +181,8 @@ async def run_interactive():
 
 if __name__ == "__main__":
     if "--interactive" in sys.argv:
-        asyncio.run(run_interactive())
+        run_loop(run_interactive())
     elif "--known" in sys.argv:
-        asyncio.run(run_scenario("Known Customer (CRM Hydration)", SCENARIO_KNOWN, CALL_ID_KNOWN))
+        run_loop(run_scenario("Known Customer (CRM Hydration)", SCENARIO_KNOWN, CALL_ID_KNOWN))
     else:
-        asyncio.run(run_scenario("New Customer (Full Slot-Filling)", SCENARIO_NEW, CALL_ID_NEW))
+        run_loop(run_scenario("New Customer (Full Slot-Filling)", SCENARIO_NEW, CALL_ID_NEW))
@@ -9,41 +9,69 @@ without an extra round-trip.
 
 from __future__ import annotations
 
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 
 
 # ---------------------------------------------------------------------------
 # Mock busy slots
 # ---------------------------------------------------------------------------
 
-_BUSY_SLOTS: set[str] = {
-    "2026-02-09 10:00",
-    "2026-02-09 11:00",
-    "2026-02-10 09:00",
+_SLOT_FORMAT = "%Y-%m-%d %H:%M"
+
+# 1-hour slots as bits: bit `hour` of a 24-bit day mask stands for hour:00.
+_DAY_HOURS = (1 << 24) - 1
+
+# Busy hours per day, keyed by date ordinal.  Membership is a bit test and
+# _next_available walks the free bits of a day instead of every hour.
+_BUSY_MASK: dict[int, int] = {
+    datetime(2026, 2, 9).toordinal(): 1 << 10 | 1 << 11,
+    datetime(2026, 2, 10).toordinal(): 1 << 9,
 }
 
 # Business hours: 09:00 – 17:00, 1-hour slots, Mon–Fri
 _OPEN_HOUR = 9
 _CLOSE_HOUR = 17
 
+# One bit per (weekday, hour) of the week — bit weekday*24 + hour is set
+# when that hour is a business slot.
+_BIZ_BITS = sum(
+    1 << (day * 24 + hour)
+    for day in range(5)
+    for hour in range(_OPEN_HOUR, _CLOSE_HOUR)
+)
+
 
 def _is_business_slot(dt: datetime) -> bool:
-    return dt.weekday() < 5 and _OPEN_HOUR <= dt.hour < _CLOSE_HOUR
+    return (_BIZ_BITS >> (dt.weekday() * 24 + dt.hour)) & 1 == 1
+
+
+def _is_busy(dt: datetime) -> bool:
+    return (_BUSY_MASK.get(dt.toordinal(), 0) >> dt.hour) & 1 == 1
 
 
 def _next_available(after: datetime, count: int = 2) -> list[str]:
     """Return the next `count` available business-hour slots after `after`."""
     slots: list[str] = []
-    candidate = after.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
-    while len(slots) < count:
-        if _is_business_slot(candidate):
-            key = candidate.strftime("%Y-%m-%d %H:%M")
-            if key not in _BUSY_SLOTS:
-                slots.append(key)
-        candidate += timedelta(hours=1)
-        # safety: don't loop forever
-        if candidate > after + timedelta(days=30):
-            break
+    start = after.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    # safety: don't search forever
+    limit = after + timedelta(days=30)
+    day = start.date()
+    first_hour = start.hour
+    while len(slots) < count and day <= limit.date():
+        free = (
+            (_BIZ_BITS >> (day.weekday() * 24))
+            & (_DAY_HOURS >> first_hour << first_hour)
+            & ~_BUSY_MASK.get(day.toordinal(), 0)
+        )
+        while free and len(slots) < count:
+            low = free & -free
+            slot = datetime.combine(day, time(low.bit_length() - 1))
+            if slot > limit:
+                return slots
+            slots.append(slot.strftime(_SLOT_FORMAT))
+            free ^= low
+        day += timedelta(days=1)
+        first_hour = 0
     return slots
 
 
@@ -60,7 +88,7 @@ async def check_availability(date_str: str) -> dict:
     """
     key = date_str.strip()
     try:
-        dt = datetime.strptime(key, "%Y-%m-%d %H:%M")
+        dt = datetime.strptime(key, _SLOT_FORMAT)
     except ValueError:
         return {
             "available": False,
@@ -76,7 +104,7 @@ async def check_availability(date_str: str) -> dict:
             "alternatives": _next_available(dt),
         }
 
-    if key in _BUSY_SLOTS:
+    if _is_busy(dt):
         return {
             "available": False,
             "requested": key,
@@ -88,7 +116,9 @@ async def check_availability(date_str: str) -> dict:
 
 async def book_slot(date_str: str, user_dni: str) -> dict:
     """Confirm a booking.  In production this writes to the calendar backend."""
-    _BUSY_SLOTS.add(date_str.strip())
+    dt = datetime.strptime(date_str.strip(), _SLOT_FORMAT)
+    ordinal = dt.toordinal()
+    _BUSY_MASK[ordinal] = _BUSY_MASK.get(ordinal, 0) | 1 << dt.hour
     return {
         "booked": True,
         "slot": date_str.strip(),
@@ -4,46 +4,64 @@ Omvyx Voice — CRM Tool (Mock)
 Simulates a CRM backend with rich client profiles, interaction history,
 loyalty levels, and support for both INSERT and UPDATE operations.
 
-Replace the mock dictionaries with real DB/API calls in production.
+Replace the mock table with real DB/API calls in production.
 """
 
 from __future__ import annotations
 
+from dataclasses import dataclass, replace
 from typing import Any
 
 
+# ---------------------------------------------------------------------------
+# Records — frozen, so lookup_user can hand out the stored instance without
+# a defensive copy; writes replace the table entry with a new instance.
+# ---------------------------------------------------------------------------
+
+@dataclass(slots=True, frozen=True)
+class UserRecord:
+    """One CRM client record."""
+    name: str
+    dni: str
+    email: str = ""
+    phone: str = ""
+    address: str = ""
+    loyalty_level: str = "standard"
+    interaction_history: tuple[dict[str, Any], ...] = ()
+
+
 # ---------------------------------------------------------------------------
 # Mock database — keyed by DNI
 # ---------------------------------------------------------------------------
 
-_MOCK_USERS: dict[str, dict[str, Any]] = {
-    "12345678A": {
-        "name": "María García",
-        "dni": "12345678A",
-        "email": "maria@example.com",
-        "phone": "+34600111222",
-        "address": "Calle Serrano 45, Madrid",
-        "loyalty_level": "gold",
-        "interaction_history": [
+_MOCK_USERS: dict[str, UserRecord] = {
+    "12345678A": UserRecord(
+        name="María García",
+        dni="12345678A",
+        email="maria@example.com",
+        phone="+34600111222",
+        address="Calle Serrano 45, Madrid",
+        loyalty_level="gold",
+        interaction_history=(
             {"type": "appointment", "date": "2025-12-10", "summary": "Consulta general"},
             {"type": "call", "date": "2026-01-15", "summary": "Cambio de cita"},
-        ],
-    },
-    "87654321B": {
-        "name": "Carlos López",
-        "dni": "87654321B",
-        "email": "carlos@example.com",
-        "phone": "+34600333444",
-        "address": "Avenida de la Constitución 12, Sevilla",
-        "loyalty_level": "silver",
-        "interaction_history": [
+        ),
+    ),
+    "87654321B": UserRecord(
+        name="Carlos López",
+        dni="87654321B",
+        email="carlos@example.com",
+        phone="+34600333444",
+        address="Avenida de la Constitución 12, Sevilla",
+        loyalty_level="silver",
+        interaction_history=(
             {"type": "appointment", "date": "2026-01-20", "summary": "Primera visita"},
-        ],
-    },
+        ),
+    ),
 }
 
 
-async def lookup_user(dni: str) -> dict[str, Any] | None:
+async def lookup_user(dni: str) -> UserRecord | None:
     """
     Search for an existing user by DNI.
 
@@ -55,22 +73,20 @@ async def lookup_user(dni: str) -> dict[str, Any] | None:
 
 async def create_user(
     name: str, dni: str, email: str = "", phone: str = "", **extra: Any,
-) -> dict[str, Any]:
+) -> UserRecord:
     """Register a new user (INSERT) and return the created record."""
-    record: dict[str, Any] = {
-        "name": name.strip(),
-        "dni": dni.strip().upper(),
-        "email": email.strip().lower() if email else "",
-        "phone": phone.strip() if phone else "",
-        "address": extra.get("address", ""),
-        "loyalty_level": "standard",
-        "interaction_history": [],
-    }
-    _MOCK_USERS[record["dni"]] = record
+    record = UserRecord(
+        name=name.strip(),
+        dni=dni.strip().upper(),
+        email=email.strip().lower() if email else "",
+        phone=phone.strip() if phone else "",
+        address=extra.get("address", ""),
+    )
+    _MOCK_USERS[record.dni] = record
     return record
 
 
-async def update_user(dni: str, **fields: Any) -> dict[str, Any] | None:
+async def update_user(dni: str, **fields: Any) -> UserRecord | None:
     """
     Update an existing user's profile (UPDATE, not INSERT).
 
@@ -82,9 +98,11 @@ async def update_user(dni: str, **fields: Any) -> dict[str, Any] | None:
     if record is None:
         return None
 
-    for field, value in fields.items():
-        if value is not None and value != "":
-            record[field] = value
-
-    _MOCK_USERS[key] = record
+    changes = {
+        field: value for field, value in fields.items()
+        if value is not None and value != ""
+    }
+    if changes:
+        record = replace(record, **changes)
+        _MOCK_USERS[key] = record
     return record
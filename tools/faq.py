@@ -7,7 +7,14 @@ vector-similarity search over an embedding index.
 
 from __future__ import annotations
 
+import functools
+import re
 
+
+# Keywords match whole words (plus their -s / -es plurals); a trailing "*"
+# marks a stem that matches any word starting with it ("cancel*" covers
+# "cancelo", "cancelen", "cancellation"), the convention the intent router's
+# signals in graph.workflow use too.
 _FAQ_ENTRIES: list[dict[str, str]] = [
     {
         "keywords": ["ubicación", "dirección", "dónde", "location", "where", "address"],
@@ -17,14 +24,14 @@ _FAQ_ENTRIES: list[dict[str, str]] = [
         ),
     },
     {
-        "keywords": ["horario", "hora", "hours", "schedule", "abierto", "open"],
+        "keywords": ["horario*", "hora", "hours", "schedule", "abierto", "open*"],
         "answer": (
             "Nuestro horario de atención es de lunes a viernes, "
             "de 9:00 a 17:00. Los fines de semana permanecemos cerrados."
         ),
     },
     {
-        "keywords": ["precio", "costo", "tarifa", "price", "cost", "rate"],
+        "keywords": ["precio*", "costo*", "tarifa", "price*", "cost*", "rate"],
         "answer": (
             "La consulta inicial tiene un costo de 50 €. "
             "Los precios de servicios adicionales dependen del tratamiento. "
@@ -32,7 +39,7 @@ _FAQ_ENTRIES: list[dict[str, str]] = [
         ),
     },
     {
-        "keywords": ["cancelar", "cancel", "anular"],
+        "keywords": ["cancel*", "anul*"],
         "answer": (
             "Puede cancelar o reprogramar su cita con al menos 24 horas de antelación "
             "sin cargo alguno. Para cancelaciones con menos de 24 horas, "
@@ -47,7 +54,7 @@ _FAQ_ENTRIES: list[dict[str, str]] = [
         ),
     },
     {
-        "keywords": ["parking", "estacionamiento", "aparcar"],
+        "keywords": ["parking", "estacionamiento", "aparc*"],
         "answer": (
             "Disponemos de parking gratuito para pacientes en el sótano del edificio. "
             "La entrada se encuentra en la calle lateral."
@@ -56,12 +63,62 @@ _FAQ_ENTRIES: list[dict[str, str]] = [
 ]
 
 
+_NON_WORD_RE = re.compile(r"\W+")
+
+# Accent folding applied after casefold(), so "Dónde" / "donde" / "DONDE"
+# all normalize alike and keywords need only one spelling each.
+_STRIP_ACCENTS = str.maketrans("áéíóúüàèìòù", "aeiouuaeiou")
+
+
+def _normalize_query(query: str) -> str:
+    """Casefold, strip accents, collapse punctuation/whitespace — the cache key."""
+    return _NON_WORD_RE.sub(" ", query.casefold().translate(_STRIP_ACCENTS)).strip()
+
+
+def _keyword_index(keywords: list[str]) -> tuple[frozenset[str], tuple[str, ...]]:
+    """
+    (whole words, stems) for one entry, normalized like queries.  Whole
+    words also cover their plurals ("dirección" matches "direcciones").
+    """
+    words: set[str] = set()
+    stems: list[str] = []
+    for keyword in keywords:
+        if keyword.endswith("*"):
+            stems.append(_normalize_query(keyword[:-1]))
+        else:
+            base = _normalize_query(keyword)
+            words.update((base, base + "s", base + "es"))
+    return frozenset(words), tuple(stems)
+
+
+# One index per entry, in priority order: a query matches an entry when one
+# of its words is in the entry's set (a C-level hash probe) or starts with
+# one of its stems (str.startswith over a tuple) — never mid-word, so
+# "hora" does not match "ahora".
+_FAQ_INDEX: list[tuple[frozenset[str], tuple[str, ...], str]] = [
+    (*_keyword_index(entry["keywords"]), entry["answer"]) for entry in _FAQ_ENTRIES
+]
+
+
+@functools.lru_cache(maxsize=512)
+def _match_faq(normalized: str) -> str | None:
+    """
+    Keyword match over a normalized query.  Callers repeat the same few
+    questions, so results are memoized.  _FAQ_INDEX is built from
+    _FAQ_ENTRIES at import; rebuild it and call _match_faq.cache_clear() if
+    the entries are ever changed at runtime.
+    """
+    words = normalized.split()
+    for keywords, stems, answer in _FAQ_INDEX:
+        if not keywords.isdisjoint(words):
+            return answer
+        if stems and any(word.startswith(stems) for word in words):
+            return answer
+    return None
+
+
 async def search_faq(query: str) -> str | None:
     """
     Return the best matching FAQ answer, or None if no match.
     """
-    query_lower = query.lower()
-    for entry in _FAQ_ENTRIES:
-        if any(kw in query_lower for kw in entry["keywords"]):
-            return entry["answer"]
-    return None
+    return _match_faq(_normalize_query(query))